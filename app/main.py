@@ -1,11 +1,21 @@
 from __future__ import annotations
+import asyncio
 import os
 import re
+import time
 import logging
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from itertools import chain
+from typing import Dict, List, Optional, Tuple
 
 import httpx
 import numpy as np
+
+try:
+    # Faster decoding of the paginated /messages payloads.
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 from fastembed import TextEmbedding
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
@@ -18,6 +28,9 @@ logging.basicConfig(level=logging.INFO)
 APP_NAME = "member-qa"
 
 
+CONTROL_CHARS_RE = re.compile(r"[\x00-\x1F\x7F]")
+
+
 def _clean_base_url(raw: str) -> str:
     """
     Strip whitespace AND remove any control characters (like '\n', '\r', '\t')
@@ -28,7 +41,7 @@ def _clean_base_url(raw: str) -> str:
         return default
 
     # Remove all ASCII control chars 0x00–0x1F and 0x7F
-    cleaned = re.sub(r"[\x00-\x1F\x7F]", "", raw)
+    cleaned = CONTROL_CHARS_RE.sub("", raw)
     cleaned = cleaned.strip()
 
     if not cleaned:
@@ -48,9 +61,28 @@ _raw_base = os.getenv(
 MESSAGES_API_BASE = _clean_base_url(_raw_base)
 logger.info("Using MESSAGES_API_BASE: %r", MESSAGES_API_BASE)
 
+
+def _messages_url(base: str) -> str:
+    """
+    Resolve the /messages endpoint from the (already cleaned) base URL.
+    If it already ends with /messages or /messages/, we don't append again.
+    """
+    base = base.rstrip("/")
+    if base.endswith("/messages"):
+        return base
+    return f"{base}/messages"
+
+
+# Resolved once: every page request hits the same endpoint.
+MESSAGES_URL = _messages_url(MESSAGES_API_BASE)
+logger.info("Using upstream messages URL: %r", MESSAGES_URL)
+
 TIMEOUT = float(os.getenv("MESSAGES_API_TIMEOUT", "25"))
 PAGE_LIMIT = int(os.getenv("MESSAGES_API_LIMIT", "50"))
 MAX_PAGES = int(os.getenv("MESSAGES_API_MAX_PAGES", "20"))
+FETCH_CONCURRENCY = int(os.getenv("MESSAGES_API_CONCURRENCY", "8"))
+MESSAGES_CACHE_TTL = float(os.getenv("MESSAGES_CACHE_TTL", "60"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
 
 HEADERS = {
     "Accept": "application/json",
@@ -65,8 +97,15 @@ msg_texts: List[str] = []          # indexed message texts
 msg_meta: List[Dict] = []          # {id, user_name, timestamp}
 msg_vecs: Optional[np.ndarray] = None  # [N, D] normalized embeddings
 
+# Snapshot of the upstream messages shared by every /ask call.
+# `data` is None until the first successful fetch; `index` maps a normalized
+# user name to that user's non-empty messages and is rebuilt with `data`;
+# `version` is bumped on every refresh.
+_CACHE: Dict = {"ts": 0.0, "data": None, "index": {}, "version": 0}
+_CACHE_LOCK = asyncio.Lock()
 
-raw_msgs: List[Dict] = []
+# /ask answers keyed by (snapshot version, question), least recently used first.
+_ANSWER_CACHE: "OrderedDict[Tuple[int, str], str]" = OrderedDict()
 
 app = FastAPI(title=APP_NAME)
 
@@ -85,70 +124,110 @@ class AskResponse(BaseModel):
 
 # Upstream client
 
-async def fetch_messages_page(skip: int = 0, limit: int = PAGE_LIMIT) -> Dict:
-    """
-    Fetch one page from the upstream /messages endpoint.
+# One pooled client for the whole process so pagination reuses keep-alive
+# connections instead of paying a fresh TCP/TLS handshake per page.
+_CLIENT: Optional[httpx.AsyncClient] = None
 
-    We are defensive about MESSAGES_API_BASE:
-    - Strip whitespace / control chars.
-    - If it already ends with /messages or /messages/, we don't append again.
-    - Otherwise, we append /messages.
-    """
-    raw_base = MESSAGES_API_BASE or ""
-    # remove any control chars that somehow survived
-    cleaned_base = re.sub(r"[\x00-\x1F\x7F]", "", raw_base).strip()
 
-    if not cleaned_base:
-        raise RuntimeError("MESSAGES_API_BASE is empty or invalid after cleaning")
+def _get_client() -> httpx.AsyncClient:
+    global _CLIENT
+    if _CLIENT is None or _CLIENT.is_closed:
+        _CLIENT = httpx.AsyncClient(
+            timeout=TIMEOUT,
+            follow_redirects=True,
+            trust_env=True,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+            http2=True,
+        )
+    return _CLIENT
 
-    base = cleaned_base.rstrip("/")
-    if base.endswith("/messages"):
-        url = base
-    else:
-        url = f"{base}/messages"
 
-    # one more guard at the final URL level
-    url = re.sub(r"[\x00-\x1F\x7F]", "", url)
+@app.on_event("startup")
+async def open_client() -> None:
+    _get_client()
+
 
-    logger.info("Using upstream messages URL: %r", url)
+@app.on_event("shutdown")
+async def close_client() -> None:
+    global _CLIENT
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+        _CLIENT = None
 
-    async with httpx.AsyncClient(
-        timeout=TIMEOUT,
-        follow_redirects=True,
-        headers=HEADERS,
-    ) as client:
-        try:
-            r = await client.get(url, params={"skip": int(skip), "limit": int(limit)})
-        except httpx.InvalidURL as e:
-            logger.error("Invalid URL used for upstream request: %r (%s)", url, e)
-            raise
-
-        if r.status_code >= 400:
-            logger.error(
-                "Upstream error %s for %s?skip=%s&limit=%s ; body=%s",
-                r.status_code,
-                url,
-                skip,
-                limit,
-                r.text[:300],
-            )
-        r.raise_for_status()
-        return r.json()
+
+async def fetch_messages_page(skip: int = 0, limit: int = PAGE_LIMIT) -> Dict:
+    """
+    Fetch one page from the upstream /messages endpoint (MESSAGES_URL).
+    """
+    url = MESSAGES_URL
+    client = _get_client()
+    try:
+        r = await client.get(
+            url,
+            params={"skip": skip, "limit": limit},
+            headers=HEADERS,
+        )
+    except httpx.InvalidURL as e:
+        logger.error("Invalid URL used for upstream request: %r (%s)", url, e)
+        raise
+
+    if r.status_code >= 400:
+        logger.error(
+            "Upstream error %s for %s?skip=%s&limit=%s ; body=%s",
+            r.status_code,
+            url,
+            skip,
+            limit,
+            r.text[:300],
+        )
+    r.raise_for_status()
+    return json_loads(r.content)
+
+
+async def _fetch_pages(sem: asyncio.Semaphore, skips: List[int]) -> List:
+    """
+    Fetch the given pages concurrently (bounded by `sem`). Failures are
+    returned in place of the page so the caller can decide, in order,
+    whether a later error even matters.
+    """
+    async def one(skip: int) -> Dict:
+        async with sem:
+            return await fetch_messages_page(skip=skip, limit=PAGE_LIMIT)
+
+    return list(await asyncio.gather(*(one(s) for s in skips), return_exceptions=True))
 
 
 async def fetch_all_messages(max_pages: int = MAX_PAGES) -> List[Dict]:
     """
     Fetch multiple pages, but stop gracefully on 400/401/404/405 instead of blowing up.
     This way, we still use whatever data we got from earlier pages.
+
+    The first page is fetched on its own; only if it comes back full are the
+    remaining pages requested concurrently (capped by the upstream `total`
+    when it reports one). Results are then walked in `skip` order so the
+    stop-on-short-page / stop-on-error semantics match a sequential crawl.
     """
-    items: List[Dict] = []
-    skip = 0
+    pages: List[List[Dict]] = []
 
-    for _ in range(max_pages):
-        try:
-            page = await fetch_messages_page(skip=skip, limit=PAGE_LIMIT)
-        except httpx.HTTPStatusError as e:
-            code = e.response.status_code if e.response is not None else None
+    if max_pages <= 0:
+        return []
+
+    sem = asyncio.Semaphore(FETCH_CONCURRENCY)
+    results = await _fetch_pages(sem, [0])
+    first = results[0]
+    if not isinstance(first, BaseException) and len(first.get("items", []) or []) == PAGE_LIMIT:
+        n_pages = max_pages
+        total = first.get("total")
+        if isinstance(total, int) and total > 0:
+            n_pages = min(max_pages, -(-total // PAGE_LIMIT))
+        results += await _fetch_pages(
+            sem, [i * PAGE_LIMIT for i in range(1, n_pages)]
+        )
+
+    for i, page in enumerate(results):
+        skip = i * PAGE_LIMIT
+        if isinstance(page, httpx.HTTPStatusError):
+            code = page.response.status_code if page.response is not None else None
             if code in (400, 401, 404, 405):
                 logger.warning(
                     "Stopping pagination at skip=%s due to upstream %s",
@@ -156,48 +235,144 @@ async def fetch_all_messages(max_pages: int = MAX_PAGES) -> List[Dict]:
                     code,
                 )
                 break
-            raise
+            raise page
+        if isinstance(page, BaseException):
+            raise page
 
         batch = page.get("items", []) or []
         if not batch:
             break
-        items.extend(batch)
+        pages.append(batch)
 
         if len(batch) < PAGE_LIMIT:
             break
 
-        skip += PAGE_LIMIT
-
+    # Pages are already in skip order; flatten once at the end.
+    items = list(chain.from_iterable(pages))
     logger.info(
         "Fetched %d messages (pages=%d, page_size=%d)",
         len(items),
-        (skip // PAGE_LIMIT) + 1 if items else 0,
+        len(pages),
         PAGE_LIMIT,
     )
     return items
 
 
+def build_user_index(all_msgs: List[Dict]) -> Dict[str, List[str]]:
+    """
+    Map normalized user name -> that user's stripped, non-empty messages.
+    Each distinct raw `user_name` is normalized only once.
+    """
+    index: Dict[str, List[str]] = {}
+    buckets: Dict[Optional[str], List[str]] = {}
+    for m in all_msgs:
+        msg = (m.get("message") or "").strip()
+        if not msg:
+            continue
+        uname = m.get("user_name")
+        bucket = buckets.get(uname)
+        if bucket is None:
+            bucket = buckets[uname] = index.setdefault(normalize_name(uname), [])
+        bucket.append(msg)
+    return index
+
+
+def _store_messages(msgs: List[Dict]) -> None:
+    _CACHE["data"] = msgs
+    _CACHE["index"] = build_user_index(msgs)
+    _CACHE["ts"] = time.monotonic()
+    _CACHE["version"] += 1
+
+
+def _cache_is_fresh() -> bool:
+    return (
+        _CACHE["data"] is not None
+        and time.monotonic() - _CACHE["ts"] < MESSAGES_CACHE_TTL
+    )
+
+
+async def get_all_messages() -> List[Dict]:
+    """
+    Return the cached message snapshot, refreshing it from upstream once it is
+    older than MESSAGES_CACHE_TTL seconds.
+
+    Concurrent callers share a single in-flight refresh. If a refresh fails
+    but we still hold an older snapshot, we keep serving it (and retry after
+    another TTL) rather than failing the request.
+    """
+    if _cache_is_fresh():
+        return _CACHE["data"]
+
+    async with _CACHE_LOCK:
+        if _cache_is_fresh():
+            return _CACHE["data"]
+
+        stale = _CACHE["data"]
+        try:
+            msgs = await fetch_all_messages()
+        except Exception as e:
+            if not stale:
+                raise
+            logger.warning("Refreshing messages failed, serving cached copy: %s", e)
+            _CACHE["ts"] = time.monotonic()
+            return stale
+
+        _store_messages(msgs)
+        return msgs
+
+
+async def get_user_index() -> Dict[str, List[str]]:
+    """
+    Per-user message buckets for the current snapshot (see get_all_messages).
+    """
+    await get_all_messages()
+    return _CACHE["index"]
+
+
 # Intent detection (regex)
 
 TRIP_Q_RE = re.compile(
-    r"(?i)when\s+is\s+(.+?)\s+planning\s+(?:her|his|their)?\s*trip\s+to\s+([A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)*)\s*\??\s*$"
+    r"(?i)when\s+is\s+(?P<name>.+?)\s+planning\s+(?:her|his|their)?\s*trip\s+to\s+(?P<city>[A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)*)\s*\??\s*$"
 )
 
 YESNO_TRIP_Q_RE = re.compile(
-    r"(?i)is\s+(.+?)\s+(?:going|traveling|travelling|heading)\s+to\s+([A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)*)\s*\??\s*$"
+    r"(?i)is\s+(?P<name>.+?)\s+(?:going|traveling|travelling|heading)\s+to\s+(?P<city>[A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)*)\s*\??\s*$"
 )
 
 # New: generic “tell me something about X’s trip”
 TRIP_SUMMARY_Q_RE = re.compile(
-    r"(?i)tell\s+me\s+something\s+about\s+(.+?)['’]s\s+trip"
+    r"(?i)tell\s+me\s+something\s+about\s+(?P<name>.+?)['’]s\s+trip"
 )
 
-CARS_Q_RE = re.compile(r"(?i)how\s+many\s+cars\s+does\s+(.+?)\s+have\??")
-FAV_Q_RE = re.compile(r"(?i)what\s+are\s+(.+?)['’]s\s+favorite\s+restaurants\??")
+CARS_Q_RE = re.compile(r"(?i)how\s+many\s+cars\s+does\s+(?P<name>.+?)\s+have\??")
+FAV_Q_RE = re.compile(r"(?i)what\s+are\s+(?P<name>.+?)['’]s\s+favorite\s+restaurants\??")
+
+# Question intents, in the order /ask gives them priority.
+INTENTS = [
+    ("trip_summary", TRIP_SUMMARY_Q_RE),
+    ("trip", TRIP_Q_RE),
+    ("yesno_trip", YESNO_TRIP_Q_RE),
+    ("cars", CARS_Q_RE),
+    ("favorite_restaurants", FAV_Q_RE),
+]
+
+
+def detect_intent(q: str) -> Tuple[Optional[str], Dict[str, Optional[str]]]:
+    """
+    First intent in INTENTS whose pattern matches `q`, with its named groups.
+    """
+    for intent, pat in INTENTS:
+        m = pat.search(q)
+        if m:
+            return intent, m.groupdict()
+    return None, {}
+
 
-NAME_NORM = lambda s: re.sub(r"\s+", " ", (s or "").strip().lower())
 DATE_WORDS = r"(?:on|around|in|by|this|next|coming|on the)"
 
+# Bare city after "to" (RAG fallback guess).
+TO_CITY_RE = re.compile(r"(?i)\bto\s+([A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)*)\b")
+
 TRIP_PATTERNS = [
     re.compile(
         rf"(?i)\b(trip|travel|fly|flight|going)\b.*\bto\b\s*(?P<city>[A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)*)[^\n]*\b{DATE_WORDS}\b\s*(?P<when>[A-Za-z0-9 ,./-]+)"
@@ -210,17 +385,13 @@ TRIP_PATTERNS = [
     ),
 ]
 
-CARS_PATTERNS = [
-    re.compile(r"(?i)\b(?P<count>\d+)\s+cars?\b"),
-    re.compile(r"(?i)\b(has|own(?:s)?)\b[^\n]*\b(?P<count>\d+)\s+cars?\b"),
-]
-
 FAV_PATTERNS = [
     re.compile(r"(?i)favorite\s+restaurants?\s*:?\s*(?P<list>.+)$"),
     re.compile(
         r"(?i)\b(love|loves|like|likes)\s+(?P<list>(?:[A-Z][\w'&]+(?:\s+[A-Z][\w'&]+)*)(?:\s*,\s*(?:and\s+)?[A-Z][\w'&]+(?:\s+[A-Z][\w'&]+)*)*)"
     ),
 ]
+FAV_LIST_SPLIT_RE = re.compile(r"\s*,\s*|\s+and\s+")
 
 # Generic "favorite things" / likes (not limited to restaurants)
 FAV_THING_PATTERNS = [
@@ -231,8 +402,15 @@ FAV_THING_PATTERNS = [
         r"(?i)\b(love|loves|like|likes|adore|enjoy)\b\s+(?P<thing>[^.?!,\n]+)"
     ),
 ]
+FAV_THING_TAIL_RE = re.compile(r"\b(but|though|however|except)\b.*$")
+FAV_THING_FILLER_RE = re.compile(r"(?i)^(really|so|just|kind of|kinda)\s+")
 
 # For name extraction
+POSSESSIVE_NAME_RE = re.compile(r"(?i)\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)['’]s\b")
+AUX_VERB_NAME_RE = re.compile(
+    r"(?i)\b(?:are|is|does|do|did|was|were|can|could|will|would|should|has|have|had)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\b"
+)
+CAP_WORD_RE = re.compile(r"\b([A-Z][a-z]+)\b")
 QUESTION_CAP_STOPWORDS = {
     "What", "When", "Where", "Why", "How", "Who", "Which", "Tell",
     "Does", "Do", "Did", "Is", "Are", "Was", "Were", "Can", "Could",
@@ -243,30 +421,41 @@ QUESTION_CAP_STOPWORDS = {
 
 # Extraction helpers
 
+def normalize_name(s: Optional[str]) -> str:
+    return " ".join((s or "").split()).lower()
+
+
 def normalize_city(s: str) -> str:
-    return re.sub(r"\s+", " ", (s or "").strip()).lower()
+    return " ".join((s or "").split()).lower()
 
 
-def messages_for_user(all_msgs: List[Dict], name_query: str) -> List[str]:
-    target = NAME_NORM(name_query)
+def messages_for_user(index: Dict[str, List[str]], name_query: str) -> List[str]:
+    """
+    Messages of every user whose normalized name contains `name_query`.
+    Only the (few) distinct user names are scanned, not the messages.
+    """
+    target = normalize_name(name_query)
     out: List[str] = []
-    for m in all_msgs:
-        if target in NAME_NORM(m.get("user_name")):
-            msg = m.get("message") or ""
-            if msg.strip():
-                out.append(msg)
+    for uname, msgs in index.items():
+        if target in uname:
+            out.extend(msgs)
     return out
 
 
 def extract_trip_when_to_city(texts: List[str], city: str) -> Optional[str]:
     city_norm = normalize_city(city)
+    # An accepted match always contains the city, so texts that don't even
+    # contain its first word are skipped with a plain substring check.
+    needle = city_norm.split(" ", 1)[0]
     for t in texts:
+        if needle not in t.lower():
+            continue
         for pat in TRIP_PATTERNS:
             m = pat.search(t)
             if not m:
                 continue
-            det_city = (m.groupdict().get("city") or "").strip()
-            when = (m.groupdict().get("when") or "").strip()
+            det_city = (m.group("city") or "").strip()
+            when = (m.group("when") or "").strip()
             if det_city and normalize_city(det_city) != city_norm:
                 continue
             if when:
@@ -274,17 +463,48 @@ def extract_trip_when_to_city(texts: List[str], city: str) -> Optional[str]:
     return None
 
 
+# Case-folds only what `(?i)cars?` treats as equal ("C"/"A"/"R"/"S" and
+# the long s "ſ"), one char for one char, so indices into the folded copy
+# are indices into the original text. str.lower() can change the length
+# ("İ" lowers to two code points) and would shift them.
+_CAR_FOLD = str.maketrans({"C": "c", "A": "a", "R": "r", "S": "s", "ſ": "s"})
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def iter_car_counts(text: str):
+    r"""
+    Yield n for every "<n> car(s)" mention, i.e. what
+    `(?i)\b(\d+)\s+cars?\b` would find, using str.find instead of
+    the regex engine: locate "car", check the word boundary after it, then
+    walk back over the whitespace and digits in front of it.
+    """
+    s = text.translate(_CAR_FOLD)
+    j = s.find("car")
+    while j >= 0:
+        k = j + 3
+        if s.startswith("s", k):
+            k += 1
+        if k == len(s) or not _is_word_char(s[k]):
+            i = j - 1
+            while i >= 0 and s[i].isspace():
+                i -= 1
+            digits_end = i + 1
+            while i >= 0 and s[i].isdecimal():
+                i -= 1
+            if (
+                digits_end < j
+                and i + 1 < digits_end
+                and (i < 0 or not _is_word_char(s[i]))
+            ):
+                yield int(s[i + 1:digits_end])
+        j = s.find("car", j + 3)
+
+
 def extract_car_count(texts: List[str]) -> Optional[str]:
-    best = None
-    for t in texts:
-        for pat in CARS_PATTERNS:
-            m = pat.search(t)
-            if m:
-                try:
-                    c = int(m.group("count"))
-                    best = c if best is None or c > best else best
-                except Exception:
-                    pass
+    best = max((n for t in texts for n in iter_car_counts(t)), default=None)
     return str(best) if best is not None else None
 
 
@@ -294,7 +514,7 @@ def extract_favorite_restaurants(texts: List[str]) -> Optional[str]:
             m = pat.search(t)
             if m:
                 raw = m.group("list")
-                items = re.split(r"\s*,\s*|\s+and\s+", raw)
+                items = FAV_LIST_SPLIT_RE.split(raw)
                 items = [i.strip().strip(". ") for i in items if i.strip()]
                 seen, ordered = set(), []
                 for i in items:
@@ -319,15 +539,8 @@ def extract_generic_favorites(texts: List[str]) -> Optional[str]:
                 thing = (m.group("thing") or "").strip()
                 if not thing:
                     continue
-                thing = re.sub(
-                    r"\b(but|though|however|except)\b.*$", "", thing
-                ).strip()
-                thing = re.sub(
-                    r"^(really|so|just|kind of|kinda)\s+",
-                    "",
-                    thing,
-                    flags=re.I,
-                ).strip()
+                thing = FAV_THING_TAIL_RE.sub("", thing).strip()
+                thing = FAV_THING_FILLER_RE.sub("", thing).strip()
                 if not thing:
                     continue
                 key = thing.lower()
@@ -344,18 +557,15 @@ def extract_name_from_question(q: str) -> Optional[str]:
     """
     Try to extract a plausible person name from the question.
     """
-    m = re.search(r"(?i)\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)['’]s\b", q)
+    m = POSSESSIVE_NAME_RE.search(q)
     if m:
         return m.group(1).strip()
 
-    m = re.search(
-        r"(?i)\b(?:are|is|does|do|did|was|were|can|could|will|would|should|has|have|had)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\b",
-        q,
-    )
+    m = AUX_VERB_NAME_RE.search(q)
     if m:
         return m.group(1).strip()
 
-    caps = re.findall(r"\b([A-Z][a-z]+)\b", q)
+    caps = CAP_WORD_RE.findall(q)
     caps = [c for c in caps if c not in QUESTION_CAP_STOPWORDS]
     if caps:
         return caps[-1].strip()
@@ -372,7 +582,7 @@ async def build_index() -> None:
     Build an embedding index over all messages once at startup.
     If it fails, we just skip RAG fallback.
     """
-    global _embedder, _msg_texts, _msg_meta, _msg_vecs, _raw_msgs
+    global _embedder, _msg_texts, _msg_meta, _msg_vecs
 
     try:
         msgs = await fetch_all_messages()
@@ -382,10 +592,9 @@ async def build_index() -> None:
         _msg_vecs = None
         _msg_texts = []
         _msg_meta = []
-        _raw_msgs = []
         return
 
-    _raw_msgs = msgs  # store raw messages for rule-based logic
+    _store_messages(msgs)  # seed the snapshot used by rule-based logic
 
     texts: List[str] = []
     meta: List[Dict] = []
@@ -454,94 +663,154 @@ def retrieve_similar_messages(
         results.append(m)
 
     if user_hint:
-        hint = NAME_NORM(user_hint)
+        hint = normalize_name(user_hint)
         results.sort(
-            key=lambda r: 0 if hint in NAME_NORM(r.get("user_name") or "") else 1
+            key=lambda r: 0 if hint in normalize_name(r.get("user_name") or "") else 1
         )
 
     return results
 
 
 
-# API Endpoints
+# Intent handlers
 
-@app.post("/ask", response_model=AskResponse)
-async def ask(req: AskRequest) -> AskResponse:
-    q = (req.question or "").strip()
-    if not q:
-        raise HTTPException(status_code=400, detail="Question must not be empty")
+def _entity(groups: Dict[str, Optional[str]], key: str) -> str:
+    return (groups.get(key) or "").strip().rstrip("?.!,")
 
-    global _raw_msgs
-    all_msgs: List[Dict] = _raw_msgs
 
-    if not all_msgs:
-        try:
-            all_msgs = await fetch_all_messages()
-            _raw_msgs = all_msgs
-        except httpx.HTTPStatusError as e:
-            body = ""
-            try:
-                body = e.response.text[:300]
-            except Exception:
-                pass
-            code = e.response.status_code if e.response is not None else "unknown"
-            return AskResponse(
-                answer=f"Upstream API error ({code}): {body or 'no details'}"
-            )
-        except httpx.RequestError as e:
-            return AskResponse(
-                answer=f"Upstream API request failed (network/timeout): {e}"
-            )
-        except Exception as e:
-            logger.exception("Unexpected error fetching messages: %s", e)
-            return AskResponse(
-                answer=f"Unexpected error fetching messages: {type(e).__name__}: {e!r}"
-            )
+def answer_trip_summary(index: Dict[str, List[str]], groups: Dict) -> AskResponse:
+    name = _entity(groups, "name")
+    texts = messages_for_user(index, name)
+    if not texts:
+        return AskResponse(answer=f"I couldn't find any messages for {name}.")
 
-    q_lower = q.lower()
+    trip_snips: List[str] = []
+    for t in texts:
+        tl = t.lower()
+        if (
+            "trip" in tl
+            or "flight" in tl
+            or "fly to" in tl
+            or "going to" in tl
+            or "travel to" in tl
+        ):
+            trip_snips.append(t)
+        if len(trip_snips) >= 3:
+            break
 
-    # Trip summary intent 
-    m = TRIP_SUMMARY_Q_RE.search(q)
-    if m:
-        name = m.group(1).strip().rstrip("?.!,")
-        texts = messages_for_user(all_msgs, name)
-        if not texts:
-            return AskResponse(answer=f"I couldn't find any messages for {name}.")
-
-        trip_snips: List[str] = []
-        for t in texts:
-            tl = t.lower()
-            if (
-                "trip" in tl
-                or "flight" in tl
-                or "fly to" in tl
-                or "going to" in tl
-                or "travel to" in tl
-            ):
-                trip_snips.append(t.strip())
-            if len(trip_snips) >= 3:
-                break
+    if not trip_snips:
+        return AskResponse(
+            answer=f"I couldn't find any detailed trip messages for {name}."
+        )
 
-        if not trip_snips:
-            return AskResponse(
-                answer=f"I couldn't find any detailed trip messages for {name}."
-            )
+    joined = " | ".join(trip_snips)
+    return AskResponse(
+        answer=f"Here are some details mentioned about {name}'s trip: {joined}"
+    )
 
-        joined = " | ".join(trip_snips)
+
+# Intent 1: Trip timing to a city
+def answer_trip(index: Dict[str, List[str]], groups: Dict) -> AskResponse:
+    name = _entity(groups, "name")
+    city = _entity(groups, "city")
+    logger.info("Parsed trip intent → name=%r city=%r", name, city)
+    texts = messages_for_user(index, name)
+    if not texts:
+        return AskResponse(answer=f"I couldn't find any messages for {name}.")
+    when = extract_trip_when_to_city(texts, city)
+    return AskResponse(answer=when or f"No trip to {city} found for {name}.")
+
+
+# Intent 1b: Yes/No trip ("Is Layla going to London?")
+def answer_yesno_trip(index: Dict[str, List[str]], groups: Dict) -> AskResponse:
+    name = _entity(groups, "name")
+    city = _entity(groups, "city")
+    logger.info("Parsed yes/no trip intent → name=%r city=%r", name, city)
+    texts = messages_for_user(index, name)
+    if not texts:
+        return AskResponse(answer=f"I couldn't find any messages for {name}.")
+
+    when = extract_trip_when_to_city(texts, city)
+    if when:
         return AskResponse(
-            answer=f"Here are some details mentioned about {name}'s trip: {joined}"
+            answer=f"Yes, {name} mentioned a trip to {city} around {when}."
         )
 
+    city_lower = city.lower()
+    found_city = any(
+        (city_lower in t.lower())
+        and ("trip" in t.lower() or "going" in t.lower())
+        for t in texts
+    )
+    if found_city:
+        return AskResponse(
+            answer=f"{name} mentioned a trip to {city}, but I couldn't infer an exact date."
+        )
+
+    return AskResponse(
+        answer=f"I couldn't find any trip to {city} mentioned by {name}."
+    )
+
+
+# Intent 2: Car count
+def answer_cars(index: Dict[str, List[str]], groups: Dict) -> AskResponse:
+    name = _entity(groups, "name")
+    texts = messages_for_user(index, name)
+    if not texts:
+        return AskResponse(answer=f"I couldn't find any messages for {name}.")
+    count = extract_car_count(texts)
+    return AskResponse(answer=count or f"I couldn't infer car ownership for {name}.")
+
+
+# Intent 3: Favorite restaurants
+def answer_favorite_restaurants(
+    index: Dict[str, List[str]], groups: Dict
+) -> AskResponse:
+    name = _entity(groups, "name")
+    texts = messages_for_user(index, name)
+    if not texts:
+        return AskResponse(answer=f"I couldn't find any messages for {name}.")
+    favs = extract_favorite_restaurants(texts)
+    return AskResponse(
+        answer=favs or f"No favorite restaurants found for {name}."
+    )
+
+
+INTENT_HANDLERS = {
+    "trip_summary": answer_trip_summary,
+    "trip": answer_trip,
+    "yesno_trip": answer_yesno_trip,
+    "cars": answer_cars,
+    "favorite_restaurants": answer_favorite_restaurants,
+}
+
+
+
+# API Endpoints
+
+def answer_question(q: str, user_index: Dict[str, List[str]]) -> AskResponse:
+    """
+    Rule-based answer for `q` over one message snapshot, with the RAG-lite
+    retrieval as the last resort.
+    """
+    q_lower = q.lower()
+
+    intent, groups = detect_intent(q)
+
+    # Trip summary intent
+    if intent == "trip_summary":
+        return answer_trip_summary(user_index, groups)
+
     # Generic favorite things
     if "favorite" in q_lower and "restaurant" not in q_lower:
         name = extract_name_from_question(q)
         if name:
-            texts_user = messages_for_user(all_msgs, name)
+            texts_user = messages_for_user(user_index, name)
             cands = retrieve_similar_messages(q, user_hint=name, k=EMBED_K)
             cand_texts = [
                 c["text"]
                 for c in cands
-                if NAME_NORM(name) in NAME_NORM(c.get("user_name") or "")
+                if normalize_name(name) in normalize_name(c.get("user_name") or "")
             ]
             texts = texts_user + cand_texts
             if texts:
@@ -559,7 +828,7 @@ async def ask(req: AskRequest) -> AskResponse:
     if "restaurant" in q_lower or "restaurants" in q_lower:
         name = extract_name_from_question(q)
         if name:
-            texts = messages_for_user(all_msgs, name)
+            texts = messages_for_user(user_index, name)
             if not texts:
                 return AskResponse(answer=f"I couldn't find any messages for {name}.")
 
@@ -578,7 +847,7 @@ async def ask(req: AskRequest) -> AskResponse:
                     or "table at" in tl
                     or "reservation" in tl
                 ):
-                    restaurant_snips.append(t.strip())
+                    restaurant_snips.append(t)
                 if len(restaurant_snips) >= 3:
                     break
 
@@ -591,70 +860,9 @@ async def ask(req: AskRequest) -> AskResponse:
                     )
                 )
 
-    # Intent 1: Trip timing to a city
-    m = TRIP_Q_RE.search(q)
-    if m:
-        name = m.group(1).strip().rstrip("?.!,")
-        city = m.group(2).strip().rstrip("?.!,")
-        logger.info("Parsed trip intent → name=%r city=%r", name, city)
-        texts = messages_for_user(all_msgs, name)
-        if not texts:
-            return AskResponse(answer=f"I couldn't find any messages for {name}.")
-        when = extract_trip_when_to_city(texts, city)
-        return AskResponse(answer=when or f"No trip to {city} found for {name}.")
-
-    # Intent 1b: Yes/No trip ("Is Layla going to London?")
-    m = YESNO_TRIP_Q_RE.search(q)
-    if m:
-        name = m.group(1).strip().rstrip("?.!,")
-        city = m.group(2).strip().rstrip("?.!,")
-        logger.info("Parsed yes/no trip intent → name=%r city=%r", name, city)
-        texts = messages_for_user(all_msgs, name)
-        if not texts:
-            return AskResponse(answer=f"I couldn't find any messages for {name}.")
-
-        when = extract_trip_when_to_city(texts, city)
-        if when:
-            return AskResponse(
-                answer=f"Yes, {name} mentioned a trip to {city} around {when}."
-            )
-
-        city_lower = city.lower()
-        found_city = any(
-            (city_lower in t.lower())
-            and ("trip" in t.lower() or "going" in t.lower())
-            for t in texts
-        )
-        if found_city:
-            return AskResponse(
-                answer=f"{name} mentioned a trip to {city}, but I couldn't infer an exact date."
-            )
-
-        return AskResponse(
-            answer=f"I couldn't find any trip to {city} mentioned by {name}."
-        )
-
-    # Intent 2: Car count
-    m = CARS_Q_RE.search(q)
-    if m:
-        name = m.group(1).strip().rstrip("?.!,")
-        texts = messages_for_user(all_msgs, name)
-        if not texts:
-            return AskResponse(answer=f"I couldn't find any messages for {name}.")
-        count = extract_car_count(texts)
-        return AskResponse(answer=count or f"I couldn't infer car ownership for {name}.")
-
-    # Intent 3: Favorite restaurants 
-    m = FAV_Q_RE.search(q)
-    if m:
-        name = m.group(1).strip().rstrip("?.!,")
-        texts = messages_for_user(all_msgs, name)
-        if not texts:
-            return AskResponse(answer=f"I couldn't find any messages for {name}.")
-        favs = extract_favorite_restaurants(texts)
-        return AskResponse(
-            answer=favs or f"No favorite restaurants found for {name}."
-        )
+    # Trip timing / yes-no trip / car count / favorite restaurants
+    if intent is not None:
+        return INTENT_HANDLERS[intent](user_index, groups)
 
     
     # RAG-lite fallback (for these 3 domains only)
@@ -664,9 +872,7 @@ async def ask(req: AskRequest) -> AskResponse:
     texts = [c["text"] for c in candidates]
 
     if texts:
-        city_match = re.search(
-            r"(?i)\bto\s+([A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)*)\b", q
-        )
+        city_match = TO_CITY_RE.search(q)
         city_guess = city_match.group(1) if city_match else None
         if city_guess:
             when = extract_trip_when_to_city(texts, city_guess)
@@ -689,6 +895,47 @@ async def ask(req: AskRequest) -> AskResponse:
     )
 
 
+@app.post("/ask", response_model=AskResponse)
+async def ask(req: AskRequest) -> AskResponse:
+    q = (req.question or "").strip()
+    if not q:
+        raise HTTPException(status_code=400, detail="Question must not be empty")
+
+    try:
+        user_index = await get_user_index()
+    except httpx.HTTPStatusError as e:
+        body = ""
+        try:
+            body = e.response.text[:300]
+        except Exception:
+            pass
+        code = e.response.status_code if e.response is not None else "unknown"
+        return AskResponse(
+            answer=f"Upstream API error ({code}): {body or 'no details'}"
+        )
+    except httpx.RequestError as e:
+        return AskResponse(
+            answer=f"Upstream API request failed (network/timeout): {e}"
+        )
+    except Exception as e:
+        logger.exception("Unexpected error fetching messages: %s", e)
+        return AskResponse(
+            answer=f"Unexpected error fetching messages: {type(e).__name__}: {e!r}"
+        )
+
+    key = (_CACHE["version"], q)
+    cached = _ANSWER_CACHE.get(key)
+    if cached is not None:
+        _ANSWER_CACHE.move_to_end(key)
+        return AskResponse(answer=cached)
+
+    resp = answer_question(q, user_index)
+    _ANSWER_CACHE[key] = resp.answer
+    if len(_ANSWER_CACHE) > ANSWER_CACHE_SIZE:
+        _ANSWER_CACHE.popitem(last=False)
+    return resp
+
+
 @app.post("/ask_generic", response_model=AskResponse)
 async def ask_generic(req: AskRequest) -> AskResponse:
     """
@@ -1,14 +1,21 @@
 # scripts/analyze_data.py
 from __future__ import annotations
 
+import asyncio
 import os
 import logging
-from typing import Dict, List, Any
+from typing import Dict, Iterable, List, Any, AsyncIterator
 from collections import Counter
+from itertools import chain
 from datetime import datetime
 
 import httpx
 
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 
 logger = logging.getLogger("analyze-data")
 logging.basicConfig(level=logging.INFO)
@@ -18,9 +25,16 @@ MESSAGES_API_BASE = os.getenv(
     "MESSAGES_API_BASE",
     "https://november7-730026606190.europe-west1.run.app",
 )
+
+# Mirrors app.main: accept both a bare host and a base already ending in
+# /messages. Resolved once since every page hits the same endpoint.
+_base = MESSAGES_API_BASE.rstrip("/")
+MESSAGES_URL = _base if _base.endswith("/messages") else f"{_base}/messages"
+
 TIMEOUT = float(os.getenv("MESSAGES_API_TIMEOUT", "25"))
 PAGE_LIMIT = int(os.getenv("MESSAGES_API_LIMIT", "50"))
 MAX_PAGES = int(os.getenv("MESSAGES_API_MAX_PAGES", "20"))
+FETCH_CONCURRENCY = int(os.getenv("MESSAGES_API_CONCURRENCY", "8"))
 
 HEADERS = {
     "Accept": "application/json",
@@ -28,137 +42,246 @@ HEADERS = {
 }
 
 
-async def fetch_messages_page(skip: int = 0, limit: int = PAGE_LIMIT) -> Dict:
+def make_client() -> httpx.AsyncClient:
     """
-    Fetch one page from the upstream /messages endpoint.
-
-    Mirrors the logic from app.main: defensive about base URL and handles
-    both .../messages and bare host.
+    Pooled client shared by every page request of a single run.
     """
-    base = MESSAGES_API_BASE.rstrip("/")
-    if base.endswith("/messages"):
-        url = base
-    else:
-        url = f"{base}/messages"
-
-    async with httpx.AsyncClient(
+    return httpx.AsyncClient(
         timeout=TIMEOUT,
         follow_redirects=True,
+        trust_env=True,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+        http2=True,
         headers=HEADERS,
-    ) as client:
-        r = await client.get(url, params={"skip": int(skip), "limit": int(limit)})
-        if r.status_code >= 400:
-            logger.error(
-                "Upstream error %s for %s?skip=%s&limit=%s ; body=%s",
-                r.status_code,
-                url,
-                skip,
-                limit,
-                r.text[:300],
-            )
-        r.raise_for_status()
-        return r.json()
-
-
-async def fetch_all_messages(max_pages: int = MAX_PAGES) -> List[Dict]:
+    )
+
+
+async def fetch_messages_page(
+    client: httpx.AsyncClient,
+    skip: int = 0,
+    limit: int = PAGE_LIMIT,
+) -> Dict:
+    """
+    Fetch one page from the upstream /messages endpoint (MESSAGES_URL).
+    """
+    url = MESSAGES_URL
+    r = await client.get(url, params={"skip": skip, "limit": limit})
+    if r.status_code >= 400:
+        logger.error(
+            "Upstream error %s for %s?skip=%s&limit=%s ; body=%s",
+            r.status_code,
+            url,
+            skip,
+            limit,
+            r.text[:300],
+        )
+    r.raise_for_status()
+    return json_loads(r.content)
+
+
+async def iter_message_pages(
+    client: httpx.AsyncClient,
+    max_pages: int = MAX_PAGES,
+) -> AsyncIterator[List[Dict]]:
     """
-    Fetch multiple pages, but stop gracefully on 400/401/404/405 instead of blowing up.
-    This way, we still use whatever data we got from earlier pages.
+    Yield pages of messages in skip order, stopping gracefully on
+    400/401/404/405 so callers keep whatever earlier pages returned.
+
+    Same strategy as app.main: probe the first page, then request the rest
+    concurrently (bounded by FETCH_CONCURRENCY). Each page is yielded as
+    soon as it and everything before it has arrived, so callers can
+    process the dataset without holding all of it in memory.
     """
-    items: List[Dict] = []
-    skip = 0
-
-    for page_idx in range(max_pages):
-        try:
-            page = await fetch_messages_page(skip=skip, limit=PAGE_LIMIT)
-        except httpx.HTTPStatusError as e:
-            code = e.response.status_code if e.response is not None else None
-            if code in (400, 401, 404, 405):
-                logger.warning(
-                    "Stopping pagination at skip=%s due to upstream %s",
-                    skip,
-                    code,
-                )
-                break
-            raise
-
-        batch = page.get("items", []) or []
-        if not batch:
-            break
-
-        items.extend(batch)
-
-        if len(batch) < PAGE_LIMIT:
-            break
-
-        skip += PAGE_LIMIT
+    if max_pages <= 0:
+        return
 
+    sem = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+    async def one(skip: int) -> Dict:
+        async with sem:
+            return await fetch_messages_page(client, skip=skip, limit=PAGE_LIMIT)
+
+    pending = [asyncio.ensure_future(one(0))]
+    try:
+        page_idx = 0
+        while page_idx < len(pending):
+            skip = page_idx * PAGE_LIMIT
+            try:
+                page = await pending[page_idx]
+            except httpx.HTTPStatusError as e:
+                code = e.response.status_code if e.response is not None else None
+                if code in (400, 401, 404, 405):
+                    logger.warning(
+                        "Stopping pagination at skip=%s due to upstream %s",
+                        skip,
+                        code,
+                    )
+                    return
+                raise
+
+            batch = page.get("items", []) or []
+            if not batch:
+                return
+
+            if page_idx == 0 and len(batch) == PAGE_LIMIT:
+                n_pages = max_pages
+                total = page.get("total")
+                if isinstance(total, int) and total > 0:
+                    n_pages = min(max_pages, -(-total // PAGE_LIMIT))
+                pending += [
+                    asyncio.ensure_future(one(i * PAGE_LIMIT)) for i in range(1, n_pages)
+                ]
+
+            yield batch
+
+            if len(batch) < PAGE_LIMIT:
+                return
+            page_idx += 1
+    finally:
+        # Pages past the stopping point are not needed; cancel them and
+        # swallow their errors.
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def fetch_all_messages(
+    client: httpx.AsyncClient,
+    max_pages: int = MAX_PAGES,
+) -> List[Dict]:
+    """
+    Fetch every page from iter_message_pages into one list.
+    """
+    pages = [batch async for batch in iter_message_pages(client, max_pages)]
+
+    # Pages are already in skip order; flatten once at the end.
+    items = list(chain.from_iterable(pages))
     logger.info(
         "Fetched %d messages (pages=%d, page_size=%d)",
         len(items),
-        (skip // PAGE_LIMIT) + 1 if items else 0,
+        len(pages),
         PAGE_LIMIT,
     )
     return items
 
 
-def compute_dataset_insights(msgs: List[Dict]) -> Dict[str, Any]:
+class DatasetInsights:
     """
     Lightweight anomaly / quality analysis over the messages dataset.
     This is *offline* tooling used for README / debugging, not part of the API.
+
+    Feed messages with update() as they arrive (one page at a time is fine)
+    and read the stats with summary().
+    """
+
+    def __init__(self) -> None:
+        self.total = 0
+        self.missing_user = self.missing_text = self.missing_id = 0
+        self.very_short = self.ultra_short = self.very_long = 0
+        self.dup_ids = 0
+        self.seen_ids = set()
+        self.user_counts: Counter = Counter()
+        self.bad_ts = 0
+        self.min_ts = None
+        self.max_ts = None
+
+    def update(self, msgs: Iterable[Dict]) -> None:
+        # Counters live in locals for the loop and are written back once.
+        total = self.total
+        missing_user, missing_text, missing_id = (
+            self.missing_user, self.missing_text, self.missing_id
+        )
+        very_short, ultra_short, very_long = (
+            self.very_short, self.ultra_short, self.very_long
+        )
+        dup_ids = self.dup_ids
+        seen_ids = self.seen_ids
+        user_counts = self.user_counts
+        bad_ts = self.bad_ts
+        min_ts, max_ts = self.min_ts, self.max_ts
+
+        for m in msgs:
+            total += 1
+
+            u = m.get("user_name") or ""
+            t = m.get("message") or ""
+            mid = m.get("id")
+
+            # Users
+            if u.strip():
+                user_counts[u] += 1
+            else:
+                missing_user += 1
+
+            if not t.strip():
+                missing_text += 1
+
+            if not mid:
+                missing_id += 1
+            if mid is not None:
+                if mid in seen_ids:
+                    dup_ids += 1
+                else:
+                    seen_ids.add(mid)
+
+            # Message length distribution
+            L = len(t)
+            if L <= 5:
+                very_short += 1
+            if 0 < L <= 20:
+                ultra_short += 1
+            if L >= 500:
+                very_long += 1
+
+            # Timestamp sanity check
+            ts = m.get("timestamp")
+            if not ts:
+                continue
+            try:
+                dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+            except Exception:
+                bad_ts += 1
+                continue
+            if min_ts is None or dt < min_ts:
+                min_ts = dt
+            if max_ts is None or dt > max_ts:
+                max_ts = dt
+
+        self.total = total
+        self.missing_user, self.missing_text, self.missing_id = (
+            missing_user, missing_text, missing_id
+        )
+        self.very_short, self.ultra_short, self.very_long = (
+            very_short, ultra_short, very_long
+        )
+        self.dup_ids = dup_ids
+        self.bad_ts = bad_ts
+        self.min_ts, self.max_ts = min_ts, max_ts
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "total_messages": self.total,
+            "missing_user_name": self.missing_user,
+            "missing_message_text": self.missing_text,
+            "missing_id": self.missing_id,
+            "duplicate_ids": self.dup_ids,
+            "very_short_messages_<=5_chars": self.very_short,
+            "ultra_short_messages_<=20_chars": self.ultra_short,
+            "very_long_messages_>=500_chars": self.very_long,
+            "top_users_by_message_count": self.user_counts.most_common(5),
+            "bad_timestamps": self.bad_ts,
+            "min_timestamp": self.min_ts.isoformat() if self.min_ts else None,
+            "max_timestamp": self.max_ts.isoformat() if self.max_ts else None,
+        }
+
+
+def compute_dataset_insights(msgs: Iterable[Dict]) -> Dict[str, Any]:
+    """
+    DatasetInsights over `msgs` in one go.
     """
-    total = len(msgs)
-
-    missing_user = sum(1 for m in msgs if not (m.get("user_name") or "").strip())
-    missing_text = sum(1 for m in msgs if not (m.get("message") or "").strip())
-    missing_id = sum(1 for m in msgs if not m.get("id"))
-
-    ids = [m.get("id") for m in msgs if m.get("id") is not None]
-    dup_ids = len(ids) - len(set(ids))
-
-    # Message length distribution
-    lengths = [len((m.get("message") or "")) for m in msgs]
-    very_short = sum(1 for L in lengths if L <= 5)
-    ultra_short = sum(1 for L in lengths if 0 < L <= 20)
-    very_long = sum(1 for L in lengths if L >= 500)
-
-    # Users
-    users = [m.get("user_name") or "" for m in msgs]
-    user_counts = Counter(u for u in users if u.strip())
-    top_users = user_counts.most_common(5)
-
-    # Timestamp sanity check
-    bad_ts = 0
-    min_ts = None
-    max_ts = None
-    for m in msgs:
-        ts = m.get("timestamp")
-        if not ts:
-            continue
-        try:
-            dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
-        except Exception:
-            bad_ts += 1
-            continue
-        if min_ts is None or dt < min_ts:
-            min_ts = dt
-        if max_ts is None or dt > max_ts:
-            max_ts = dt
-
-    return {
-        "total_messages": total,
-        "missing_user_name": missing_user,
-        "missing_message_text": missing_text,
-        "missing_id": missing_id,
-        "duplicate_ids": dup_ids,
-        "very_short_messages_<=5_chars": very_short,
-        "ultra_short_messages_<=20_chars": ultra_short,
-        "very_long_messages_>=500_chars": very_long,
-        "top_users_by_message_count": top_users,
-        "bad_timestamps": bad_ts,
-        "min_timestamp": min_ts.isoformat() if min_ts else None,
-        "max_timestamp": max_ts.isoformat() if max_ts else None,
-    }
+    insights = DatasetInsights()
+    insights.update(msgs)
+    return insights.summary()
 
 
 def format_insights_for_readme(ins: Dict[str, Any]) -> str:
@@ -239,12 +362,16 @@ def format_insights_for_readme(ins: Dict[str, Any]) -> str:
 
 
 async def main() -> None:
-    msgs = await fetch_all_messages()
-    if not msgs:
+    insights = DatasetInsights()
+    async with make_client() as client:
+        async for batch in iter_message_pages(client):
+            insights.update(batch)
+    if not insights.total:
         print("No messages fetched; cannot compute insights.")
         return
 
-    ins = compute_dataset_insights(msgs)
+    logger.info("Fetched %d messages (page_size=%d)", insights.total, PAGE_LIMIT)
+    ins = insights.summary()
 
     print("========== RAW INSIGHTS ==========")
     for k, v in ins.items():
@@ -255,6 +382,4 @@ async def main() -> None:
 
 
 if __name__ == "__main__":
-    import asyncio
-
     asyncio.run(main())
@@ -0,0 +1,78 @@
+import asyncio
+
+import httpx
+
+from analyze_data import (
+    PAGE_LIMIT,
+    DatasetInsights,
+    compute_dataset_insights,
+    iter_message_pages,
+)
+
+
+def _insights(*timestamps):
+    return compute_dataset_insights(
+        {"id": str(i), "user_name": "A", "message": "hello", "timestamp": ts}
+        for i, ts in enumerate(timestamps)
+    )
+
+
+def test_timestamp_range_over_valid_values():
+    ins = _insights("2024-03-01T10:00:00Z", "2023-01-05T08:30:00+00:00", "2024-01-01T00:00:00Z")
+    assert ins["bad_timestamps"] == 0
+    assert ins["min_timestamp"] == "2023-01-05T08:30:00+00:00"
+    assert ins["max_timestamp"] == "2024-03-01T10:00:00+00:00"
+
+
+def test_non_iso_values_are_bad_timestamps():
+    ins = _insights(
+        "2024-01-01T00:00:00Z",
+        "10000-01-01T00:00:00Z",
+        "now",
+        "today",
+        1700000000,
+        True,
+        "2024-01-01T00:00:00Z  ",
+    )
+    assert ins["bad_timestamps"] == 6
+    assert ins["min_timestamp"] == ins["max_timestamp"] == "2024-01-01T00:00:00+00:00"
+
+
+def test_naive_timestamp_is_not_labelled_utc():
+    ins = _insights("2024-01-01T12:00:00")
+    assert ins["min_timestamp"] == "2024-01-01T12:00:00"
+
+
+def _client(messages, fail_at=None):
+    def handler(request):
+        skip = int(request.url.params["skip"])
+        limit = int(request.url.params["limit"])
+        if skip == fail_at:
+            return httpx.Response(404)
+        return httpx.Response(
+            200, json={"total": len(messages), "items": messages[skip:skip + limit]}
+        )
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+async def _stream(client):
+    insights = DatasetInsights()
+    async with client:
+        async for batch in iter_message_pages(client):
+            insights.update(batch)
+    return insights.summary()
+
+
+def test_streamed_pages_match_whole_list():
+    msgs = [
+        {"id": str(i % 97), "user_name": f"U{i % 7}", "message": "m" * (i % 30), "timestamp": None}
+        for i in range(PAGE_LIMIT * 3 + 7)
+    ]
+    assert asyncio.run(_stream(_client(msgs))) == compute_dataset_insights(msgs)
+
+
+def test_pagination_stops_gracefully_on_404():
+    msgs = [{"id": str(i), "message": "hello"} for i in range(PAGE_LIMIT * 3)]
+    ins = asyncio.run(_stream(_client(msgs, fail_at=PAGE_LIMIT * 2)))
+    assert ins["total_messages"] == PAGE_LIMIT * 2
@@ -0,0 +1,35 @@
+import random
+import re
+
+from app.main import extract_car_count, iter_car_counts
+
+CAR_RE = re.compile(r"(?i)\b(\d+)\s+cars?\b")
+
+# Pieces chosen to hit the tricky spots: case folding that changes length
+# ("İ"), non-ASCII case equivalents ("ſ", Kelvin sign), non-ASCII digits
+# and whitespace, and word characters next to the match.
+ALPHABET = [
+    "car", "Car", "CARS", "cars", "caſ", "s", "S", "ſ", "İ", "K",
+    "1", "42", "٣", "_", "x", "é", " ", "\t", "\xa0", "\n", ".", ",",
+]
+
+
+def _regex_counts(text):
+    return [int(m.group(1)) for m in CAR_RE.finditer(text)]
+
+
+def test_matches_regex_on_fuzzed_strings():
+    rng = random.Random(17)
+    for _ in range(50_000):
+        text = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 12)))
+        assert list(iter_car_counts(text)) == _regex_counts(text), repr(text)
+
+
+def test_matches_regex_on_reported_cases():
+    for text in ["sİ٣\tCars", "İ 3 cars", "2 caſ", "٣ cars", "1\xa0car."]:
+        assert list(iter_car_counts(text)) == _regex_counts(text), repr(text)
+
+
+def test_extract_car_count_takes_largest():
+    assert extract_car_count(["I have 2 cars", "now 3 Cars", "no number cars"]) == "3"
+    assert extract_car_count(["carpool with 4 friends"]) is None
@@ -0,0 +1,43 @@
+from app.main import (
+    detect_intent,
+    extract_favorite_restaurants,
+    extract_trip_when_to_city,
+)
+
+
+# The extraction patterns rely on Python's Unicode-aware \w, \s and \b;
+# member names and messages are not ASCII-only.
+
+def test_favorite_restaurants_keep_accented_names():
+    assert extract_favorite_restaurants(["I love Café Boulud and Nobu"]) == "Café Boulud, Nobu"
+    assert (
+        extract_favorite_restaurants(["I really like Señor Frog's and Nobu"])
+        == "Señor Frog's, Nobu"
+    )
+    assert (
+        extract_favorite_restaurants(["Favorite restaurants: Chez Léon, Zuma\n"])
+        == "Chez Léon, Zuma"
+    )
+
+
+def test_favorite_restaurants_split_on_non_breaking_space():
+    assert extract_favorite_restaurants(["I love Nobu\xa0and Zuma"]) == "Nobu, Zuma"
+
+
+def test_trip_when_after_non_breaking_space():
+    assert extract_trip_when_to_city(["trip to Paris on\xa0June 5"], "Paris") == "June 5"
+
+
+def test_trip_needs_word_boundary_before_to():
+    assert extract_trip_when_to_city(["éto Paris on Monday"], "Paris") is None
+
+
+def test_intent_with_non_breaking_space():
+    assert detect_intent("How\xa0many cars does Vikram have?") == ("cars", {"name": "Vikram"})
+
+
+def test_intent_with_accented_name():
+    assert detect_intent("What are Zoë’s favorite restaurants?") == (
+        "favorite_restaurants",
+        {"name": "Zoë"},
+    )